@@ -1,14 +1,23 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response, session
+from flask.json.provider import JSONProvider
+from cachetools import TTLCache
+import orjson
 import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 import random
 import re
+import secrets
 from datetime import datetime
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
+from functools import lru_cache
+from collections import deque
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -31,7 +40,39 @@ except Exception as e:
     # You might want to add a fallback mechanism or exit the application
     raise
 
+class OrjsonProvider(JSONProvider):
+    """Serialize JSON request and response bodies with orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Signs the session cookie that keys per-user conversation state
+app.secret_key = os.getenv('SECRET_KEY')
+if not app.secret_key:
+    logger.warning("SECRET_KEY is not set; using a random per-process key, so sessions "
+                   "will not survive restarts or be shared across workers")
+    app.secret_key = secrets.token_hex(32)
+
+# Shared HTTP session so self-pings reuse pooled keep-alive connections
+_PING_SESSION = requests.Session()
+_ping_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+)
+_PING_SESSION.mount('https://', _ping_adapter)
+_PING_SESSION.mount('http://', _ping_adapter)
+_PING_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix='ping')
+
+def _ping(url):
+    # HEAD is enough: only the status matters, so skip the body entirely
+    response = _PING_SESSION.head(url, timeout=10, allow_redirects=False)
+    return response.status_code
 
 # Self-Pinging Function with Enhanced Reliability
 def keep_alive():
@@ -44,16 +85,14 @@ def keep_alive():
                 'https://academic-ai-backup.onrender.com'
             ]
             
-            # Ping multiple URLs for increased reliability
-            for url in urls:
+            # Ping multiple URLs concurrently for increased reliability
+            futures = {_PING_POOL.submit(_ping, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
                 try:
-                    response = requests.get(url, timeout=10)
-                    print(f"Self-ping status for {url}: {response.status_code}")
+                    print(f"Self-ping status for {url}: {future.result()}")
                 except requests.RequestException as e:
                     print(f"Self-ping error for {url}: {e}")
-                
-                # Add a small delay between pings to prevent overwhelming the server
-                time.sleep(2)
             
             # Reduce sleep time to ping more frequently
             time.sleep(300)  # 5 minutes instead of 20 minutes
@@ -88,6 +127,24 @@ Key Characteristics:
 - Focused on student's individual learning journey
 """
 
+AI_ACKNOWLEDGEMENT = 'I understand. I will act as Hecker, an advanced AI learning companion with the described characteristics.'
+
+GUIDELINES = """Guidelines:
+1. Provide a clear, comprehensive response
+2. Break down complex topics into digestible steps
+3. Use engaging and accessible language
+4. Include practical examples or real-world applications
+5. Use standard mathematical notation for equations
+"""
+
+# Byte-stable prompt prefix shared by every request so the provider can cache it;
+# only the trailing query turn changes between calls
+_STABLE_PREFIX = AI_DESCRIPTION + "\n" + GUIDELINES
+_STABLE_PREFIX_CONTENTS = (
+    {'role': 'user', 'parts': [_STABLE_PREFIX]},
+    {'role': 'model', 'parts': [AI_ACKNOWLEDGEMENT]}
+)
+
 # Model Configuration
 generation_config = {
     'temperature': 0.7,
@@ -102,80 +159,157 @@ safety_settings = [
     {'category': 'HARM_CATEGORY_DANGEROUS_CONTENT', 'threshold': 'BLOCK_NONE'}
 ]
 
-model = genai.GenerativeModel(
-    model_name='gemini-pro', 
-    generation_config=generation_config, 
-    safety_settings=safety_settings
+# The model is built lazily on first use, once per process
+@lru_cache(maxsize=1)
+def _get_model():
+    return genai.GenerativeModel(
+        model_name='gemini-pro', 
+        generation_config=generation_config, 
+        safety_settings=safety_settings
+    )
+
+# Frozen seed history shared by every chat session
+_CHAT_PREFIX_CONTENTS = (
+    {'role': 'user', 'parts': [AI_DESCRIPTION]},
+    {'role': 'model', 'parts': [AI_ACKNOWLEDGEMENT]}
 )
 
-chat = model.start_chat(history=[
-    {
-        'role': 'user',
-        'parts': [AI_DESCRIPTION]
-    },
-    {
-        'role': 'model',
-        'parts': ['I understand. I will act as Hecker, an advanced AI learning companion with the described characteristics.']
-    }
-])
+def _new_chat():
+    return _get_model().start_chat(history=list(_CHAT_PREFIX_CONTENTS))
+
+# Exact-match response cache keyed on the normalized query
+_RESPONSE_CACHE = TTLCache(maxsize=1024, ttl=300)
+_RESPONSE_CACHE_LOCK = threading.Lock()
 
 # Context Management
+# Keyword tables, in priority order: the first label with a hit wins
+TOPIC_KEYWORDS = {
+    'mathematics': ['math', 'algebra', 'geometry', 'calculus', 'trigonometry'],
+    'science': ['physics', 'chemistry', 'biology', 'science'],
+    'language': ['english', 'grammar', 'writing', 'literature'],
+    'history': ['history', 'historical', 'civilization', 'era'],
+    'technology': ['computer', 'programming', 'tech', 'coding']
+}
+
+COMPLEXITY_INDICATORS = {
+    'advanced': ['prove', 'derive', 'complex', 'advanced', 'theoretical'],
+    'beginner': ['explain', 'what is', 'basic', 'simple', 'introduction']
+}
+
+def _compile_keywords(table):
+    """Compile a keyword table into a single pattern that reports every (overlapping) hit"""
+    labels = {keyword: label for label, keywords in table.items() for keyword in keywords}
+    alternation = '|'.join(re.escape(keyword) for keyword in sorted(labels, key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))'), labels, tuple(table)
+
+def _match_keywords(matcher, lowered):
+    """Return the highest-priority label with a keyword in the lowercased text"""
+    pattern, labels, order = matcher
+    found = {labels[match.group(1)] for match in pattern.finditer(lowered)}
+    for label in order:
+        if label in found:
+            return label
+    return None
+
+_TOPIC_MATCHER = _compile_keywords(TOPIC_KEYWORDS)
+_DIFFICULTY_MATCHER = _compile_keywords(COMPLEXITY_INDICATORS)
+
 class ConversationContext:
     def __init__(self, max_history=5):
-        self.history = []
+        self.history = deque(maxlen=max_history)
         self.max_history = max_history
         self.current_topic = None
         self.difficulty_level = 'intermediate'
 
     def add_interaction(self, user_query, ai_response):
-        # Trim history if it exceeds max_history
-        if len(self.history) >= self.max_history:
-            self.history.pop(0)
-        
-        # Add new interaction
+        # Add new interaction; the deque drops the oldest beyond max_history
         self.history.append({
             'user_query': user_query,
             'ai_response': ai_response
         })
 
-    def detect_topic(self, query):
-        # Simple topic detection using keyword matching
-        topics = {
-            'mathematics': ['math', 'algebra', 'geometry', 'calculus', 'trigonometry'],
-            'science': ['physics', 'chemistry', 'biology', 'science'],
-            'language': ['english', 'grammar', 'writing', 'literature'],
-            'history': ['history', 'historical', 'civilization', 'era'],
-            'technology': ['computer', 'programming', 'tech', 'coding']
-        }
-
-        for topic, keywords in topics.items():
-            if any(keyword in query.lower() for keyword in keywords):
-                self.current_topic = topic
-                return topic
-        
-        return None
-
-    def adjust_difficulty(self, query):
-        # Detect complexity of query and adjust difficulty
-        complexity_indicators = {
-            'advanced': ['prove', 'derive', 'complex', 'advanced', 'theoretical'],
-            'beginner': ['explain', 'what is', 'basic', 'simple', 'introduction']
-        }
-
-        for level, indicators in complexity_indicators.items():
-            if any(indicator in query.lower() for indicator in indicators):
-                self.difficulty_level = level
-                break
-
-conversation_context = ConversationContext()
+    def detect_topic(self, lowered):
+        # Simple topic detection using keyword matching; expects a lowercased query
+        topic = _match_keywords(_TOPIC_MATCHER, lowered)
+        if topic:
+            self.current_topic = topic
+        return topic
+
+    def adjust_difficulty(self, lowered):
+        # Detect complexity of a lowercased query and adjust difficulty
+        level = _match_keywords(_DIFFICULTY_MATCHER, lowered)
+        if level:
+            self.difficulty_level = level
+        return self.difficulty_level
+
+class SessionState:
+    """Conversation context and chat belonging to one browser session"""
+
+    def __init__(self):
+        self.context = ConversationContext()
+        self.chat = None
+        # Serializes chat turns within a session; other sessions are unaffected
+        self.lock = threading.Lock()
+
+# Per-session state, keyed on the id stored in the session cookie; expires after an hour idle
+_SESSIONS = TTLCache(maxsize=10_000, ttl=3600)
+_SESSIONS_LOCK = threading.Lock()
+
+def _session_state():
+    """Return the state for the current session, creating it on first use"""
+    sid = session.get('sid')
+    if sid is None:
+        sid = session['sid'] = secrets.token_urlsafe(16)
+    with _SESSIONS_LOCK:
+        state = _SESSIONS.get(sid)
+        if state is None:
+            state = SessionState()
+        # Re-insert on every access so the TTL acts as an idle timeout
+        _SESSIONS[sid] = state
+    return state
+
+_EMOJIS = (
+    '😊', '🌟', '👍', '🚀', '🤔', '💡', '📚', '🎓', 
+    '🧠', '✨', '🌈', '👏', '🤓', '💪', '🌞'
+)
 
 def generate_emoji():
     """Generate a random emoji to add personality"""
-    emojis = [
-        '😊', '🌟', '👍', '🚀', '🤔', '💡', '📚', '🎓', 
-        '🧠', '✨', '🌈', '👏', '🤓', '💪', '🌞'
-    ]
-    return random.choice(emojis)
+    return random.choice(_EMOJIS)
+
+# Timestamp cache as a (minute, stamp) pair, replaced whole once per minute
+_ts_cache = (0, '')
+
+def _now_stamp():
+    """Return the current time formatted for display, cached per minute"""
+    global _ts_cache
+    minute = int(time.time() // 60)
+    cached_minute, stamp = _ts_cache
+    if cached_minute != minute:
+        stamp = datetime.now().strftime("%I:%M %p")
+        _ts_cache = (minute, stamp)
+    return stamp
+
+# Precompiled patterns for response formatting
+_RE_BLANKLINES = re.compile(r'\n{3,}')
+_RE_STEP = re.compile(r'^(Step\s*\d+:)', re.MULTILINE)
+_RE_CONCL = re.compile(r'^(Conclusion:)', re.MULTILINE)
+_RE_BLOCK_MATH = re.compile(r'\$\$(.*?)\$\$', re.DOTALL)
+_RE_INLINE_MATH = re.compile(r'\$(.*?)\$')
+_RE_MATH_OR_BREAK = re.compile(r'\$\$((?s:.*?))\$\$|\$(.*?)\$|\n\n+')
+_SOLUTION_RE = re.compile(r'^solution:', re.IGNORECASE)
+_HEADER_RE = re.compile(r'^(?:step |therefore|hence|thus|final)', re.IGNORECASE)
+_HTML_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#039;'
+})
+_OP_DELETE = str.maketrans('', '', '=+-×÷*/')
+_SYMBOL_STOPWORDS = frozenset(['a', 'an', 'the', 'in', 'on', 'at', 'to', 'for'])
+_SYMBOL_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_SYMBOL_SUBSCRIPTS = _SYMBOL_LETTERS | frozenset('0123456789')
 
 def format_solution(text):
     """Format mathematical solutions with clear steps and equations"""
@@ -184,11 +318,11 @@ def format_solution(text):
     formatted_steps = []
     
     for i, step in enumerate(steps):
-        if i == 0 and step.lower().startswith('solution:'):
+        if i == 0 and _SOLUTION_RE.match(step):
             formatted_steps.append(f"**{step.strip()}**\n")
         elif step.strip():
             # Format step numbers
-            if step.lower().startswith(('step ', 'therefore', 'hence', 'thus', 'final')):
+            if _HEADER_RE.match(step):
                 formatted_steps.append(f"\n**{step.strip()}**\n")
             else:
                 # Format equations and explanations
@@ -196,7 +330,7 @@ def format_solution(text):
                 formatted_lines = []
                 for line in lines:
                     # Check if line contains equations
-                    if any(char in line for char in '=+-×÷*/'):
+                    if line.translate(_OP_DELETE) != line:
                         formatted_lines.append(f"```math\n{line.strip()}\n```")
                     else:
                         formatted_lines.append(line.strip())
@@ -209,89 +343,142 @@ def sanitize_response(text):
     # Enhanced formatting to prevent multiple boxes
     
     # Normalize line breaks and spacing
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _RE_BLANKLINES.sub('\n\n', text)
     
     # Improve step and section formatting
-    text = re.sub(r'^(Step\s*\d+:)', r'**\1**', text, flags=re.MULTILINE)
-    text = re.sub(r'^(Conclusion:)', r'**\1**', text, flags=re.MULTILINE)
+    text = _RE_STEP.sub(r'**\1**', text)
+    text = _RE_CONCL.sub(r'**\1**', text)
     
     # Format equations and mathematical expressions
-    text = re.sub(r'\$\$(.*?)\$\$', r'**Equation:** \1', text, flags=re.DOTALL)
-    text = re.sub(r'\$(.*?)\$', r'*\1*', text)
+    text = _RE_BLOCK_MATH.sub(r'**Equation:** \1', text)
+    text = _RE_INLINE_MATH.sub(r'*\1*', text)
     
     # Preserve overall response structure
     text = text.strip()
     
     # Sanitize HTML to prevent XSS
-    formatted_text = (
-        text.replace('&', '&amp;')
-            .replace('<', '&lt;')
-            .replace('>', '&gt;')
-            .replace('"', '&quot;')
-            .replace("'", '&#039;')
-    )
+    formatted_text = text.translate(_HTML_ESCAPES)
     
     return formatted_text
 
+def _emit_fragment(text, seen, out):
+    """Append a plain-text fragment to out, replacing * operators and tagging new symbols"""
+    i = 0
+    n = len(text)
+    while i < n:
+        char = text[i]
+        if char == '*':
+            # Replace basic mathematical operators: ** is a power, * a product
+            if i + 1 < n and text[i + 1] == '*':
+                out.append('^')
+                i += 2
+            else:
+                out.append('×')
+                i += 1
+            continue
+        elif char in _SYMBOL_LETTERS:
+            # A symbol is a single letter with an optional one-character subscript;
+            # only the first occurrence of each is tagged
+            if i + 2 < n and text[i + 1] == '_' and text[i + 2] in _SYMBOL_SUBSCRIPTS:
+                symbol = text[i:i + 3]
+            else:
+                symbol = char
+            i += len(symbol)
+            if symbol in _SYMBOL_STOPWORDS or symbol in seen:
+                out.append(symbol)
+            else:
+                seen.add(symbol)
+                out.append(f'<span class="symbol">{symbol}</span>')
+            continue
+        out.append(char)
+        i += 1
+
+def _emit_step(pieces, tail, seen, out):
+    """Append one solution step made of (text, math match) pieces plus trailing text"""
+    if not pieces:
+        tail = tail.strip()
+        if not tail:
+            return
+    else:
+        tail = tail.rstrip()
+    
+    if out:
+        out.append('\n')
+    out.append('<div class="solution-step">')
+    for index, (plain, match) in enumerate(pieces):
+        _emit_fragment(plain.lstrip() if index == 0 else plain, seen, out)
+        if match.lastindex == 1:
+            out.append('<div class="equation">')
+            _emit_fragment(match.group(1).strip(), seen, out)
+            out.append('</div>')
+        else:
+            out.append('<span class="math-expression">')
+            _emit_fragment(match.group(2).strip(), seen, out)
+            out.append('</span>')
+    _emit_fragment(tail, seen, out)
+    out.append('</div>')
+
 def format_mathematical_notation(text):
     """
     Standardize mathematical notation across all AI responses.
-    """
-    # Replace basic mathematical operators
-    text = re.sub(r'\*\*', '^', text)
-    text = re.sub(r'\*', '×', text)
-    
-    # Format equations with proper spacing and alignment
-    equations = re.finditer(r'\$\$(.*?)\$\$', text, re.DOTALL)
-    for eq in equations:
-        formatted_eq = f'<div class="equation">{eq.group(1).strip()}</div>'
-        text = text.replace(eq.group(0), formatted_eq)
     
-    # Format inline math expressions
-    inline_math = re.finditer(r'\$(.*?)\$', text)
-    for math in inline_math:
-        formatted_math = f'<span class="math-expression">{math.group(1).strip()}</span>'
-        text = text.replace(math.group(0), formatted_math)
-    
-    # Format step-by-step solutions
-    steps = text.split('\n\n')
-    formatted_steps = []
-    for step in steps:
-        if step.strip():
-            formatted_steps.append(f'<div class="solution-step">{step.strip()}</div>')
-    
-    text = '\n'.join(formatted_steps)
-    
-    # Format variables and symbols
-    symbols = re.finditer(r'([a-zA-Z]_[0-9a-zA-Z]|[a-zA-Z])', text)
-    for symbol in symbols:
-        if symbol.group(0) in ['a', 'an', 'the', 'in', 'on', 'at', 'to', 'for']:
-            continue
-        formatted_symbol = f'<span class="symbol">{symbol.group(0)}</span>'
-        text = text.replace(symbol.group(0), formatted_symbol, 1)
+    Block math, inline math and step breaks are found in a single scan and
+    every fragment is written once to a shared list joined at the end.
+    """
+    out = []
+    seen = set()
+    pieces = []
+    pos = 0
+    for match in _RE_MATH_OR_BREAK.finditer(text):
+        plain = text[pos:match.start()]
+        pos = match.end()
+        if match.lastindex:
+            # Equation or inline math expression inside the current step
+            pieces.append((plain, match))
+        else:
+            # Blank line: close the current step
+            _emit_step(pieces, plain, seen, out)
+            pieces = []
+    _emit_step(pieces, text[pos:], seen, out)
     
-    return text
+    return ''.join(out)
+
+INITIAL_QUESTION = "Welcome to Hecker! What would you like to learn today?"
+
+# Rendered homepage, keyed on the minute stamp it was rendered for
+_HOME_CACHE = {}
 
 @app.route('/')
 def home():
-    now = datetime.now().strftime("%I:%M %p")
-    initial_question = "Welcome to Hecker! What would you like to learn today?"
-    return render_template('index.html', now=now, initial_question=initial_question)
+    global _HOME_CACHE
+    now = _now_stamp()
+    body = _HOME_CACHE.get(now)
+    if body is None:
+        body = render_template('index.html', now=now, initial_question=INITIAL_QUESTION)
+        _HOME_CACHE = {now: body}
+    response = make_response(body)
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
 
 @app.route('/generate_response', methods=['POST'])
 def generate_response():
     user_message = request.json.get('message', '')
     
+    state = _session_state()
+    
     try:
-        response = chat.send_message(user_message)
+        with state.lock:
+            if state.chat is None:
+                state.chat = _new_chat()
+            response = state.chat.send_message(user_message)
         return jsonify({
             'response': response.text,
-            'timestamp': datetime.now().strftime("%I:%M %p")
+            'timestamp': _now_stamp()
         })
     except Exception as e:
         return jsonify({
             'response': f"I'm experiencing some difficulties. Error: {str(e)}",
-            'timestamp': datetime.now().strftime("%I:%M %p")
+            'timestamp': _now_stamp()
         })
 
 @app.route('/api/query', methods=['POST'])
@@ -301,11 +488,13 @@ def query():
         query_text = data.get('query', '')
         is_regeneration = data.get('regenerate', False)
 
+        context = _session_state().context
+
         # Generate response
-        response_text = generate_response_with_context(query_text)
+        response_text = generate_response_with_context(query_text, context, regenerate=is_regeneration)
 
         # Update conversation context
-        conversation_context.add_interaction(query_text, response_text)
+        context.add_interaction(query_text, response_text)
 
         return jsonify({
             'success': True,
@@ -319,12 +508,11 @@ def query():
             'error': str(e)
         }), 500
 
-def generate_response_with_context(query):
-    """Generate a response that considers conversation context and provides detailed, step-by-step explanations"""
-    
-    # Special handling for dimensional analysis and scientific queries
-    if any(keyword in query.lower() for keyword in ['dimension', 'dimensional analysis', 'viscosity', 'prove', 'derivation']):
-        response = """😮‍💨 💗 Dimensional Analysis of Viscosity
+# Canned dimensional-analysis answer, formatted once at import
+_VISCOSITY_TRIGGERS = ('dimension', 'dimensional analysis', 'viscosity', 'prove', 'derivation')
+_RE_VISCOSITY_TRIGGER = re.compile('|'.join(map(re.escape, _VISCOSITY_TRIGGERS)))
+
+_VISCOSITY_RAW = """😮‍💨 💗 Dimensional Analysis of Viscosity
 
 **Step 1: Define the Physical Quantity**
 Viscosity (η) is a measure of a fluid's resistance to flow, defined as the ratio of shear stress to shear rate.
@@ -351,28 +539,46 @@ The dimensional analysis confirms that viscosity has consistent units:
 - Viscosity quantifies a fluid's internal resistance to flow
 - Dimensional analysis validates the physical meaning of the quantity
 """
-        return format_mathematical_notation(response)
 
-    # Default response generation logic
-    context_prompt = f"""Context:
-- Current Query: {query}
-- Conversation History: {len(conversation_context.history)} previous interactions
+_VISCOSITY_RESPONSE = format_mathematical_notation(_VISCOSITY_RAW)
 
-Guidelines:
-1. Provide a clear, comprehensive response
-2. Break down complex topics into digestible steps
-3. Use engaging and accessible language
-4. Include practical examples or real-world applications
-5. Use standard mathematical notation for equations
+def generate_response_with_context(query, context, regenerate=False):
+    """Generate a response that considers conversation context and provides detailed, step-by-step explanations"""
+    
+    # Lowercase once and reuse for every keyword check below
+    ql = query.lower()
+
+    # Special handling for dimensional analysis and scientific queries
+    if _RE_VISCOSITY_TRIGGER.search(ql):
+        return _VISCOSITY_RESPONSE
+
+    # Serve repeated queries without a Gemini round trip; regenerate always asks
+    # the model again but still refreshes the cached answer. The cache is shared
+    # across sessions and deliberately keyed on the query alone: the per-session
+    # history count in the prompt below is not part of the key
+    cache_key = ql.strip()
+    if not regenerate:
+        with _RESPONSE_CACHE_LOCK:
+            cached = _RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Default response generation logic: stable prefix first, volatile query last
+    context_prompt = f"""Context:
+- Conversation History: {len(context.history)} previous interactions
 
 Query: {query}
 """
+    contents = [*_STABLE_PREFIX_CONTENTS, {'role': 'user', 'parts': [context_prompt]}]
 
     try:
-        response = model.generate_content(context_prompt)
+        response = _get_model().generate_content(contents)
         # Apply mathematical notation formatting to the response
         formatted_response = format_mathematical_notation(response.text)
-        return sanitize_response(formatted_response)
+        sanitized = sanitize_response(formatted_response)
+        with _RESPONSE_CACHE_LOCK:
+            _RESPONSE_CACHE[cache_key] = sanitized
+        return sanitized
     except Exception as e:
         app.logger.error(f"Response generation error: {e}")
         return f"I'm sorry, I encountered an error processing your query. {generate_emoji()}"